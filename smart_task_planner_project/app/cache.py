@@ -0,0 +1,65 @@
+"""
+Short-lived caches for the by-id lookups the UI repeats
+
+Entries hold the serialized response for a goal, plan or task and live
+for CACHE_TTL_SECONDS. Writers drop the affected entries after they
+commit. Caches are per worker process, so another worker may serve a
+stale entry until its TTL runs out.
+"""
+
+from cachetools import TTLCache
+
+CACHE_TTL_SECONDS = 30
+CACHE_MAX_ENTRIES = 10_000
+
+goal_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+plan_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+task_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+
+# Bumped by every invalidation. A reader that loaded its row before a
+# write committed must not store it after that write's invalidation.
+_generation = 0
+
+def cache_generation() -> int:
+    """Take before loading a row that will be cached with cache_put"""
+    return _generation
+
+def cache_put(cache: TTLCache, key: int, value, generation: int):
+    """Store value unless an invalidation ran since generation was taken"""
+    if generation == _generation:
+        cache[key] = value
+    return value
+
+def _bump_generation():
+    global _generation
+    _generation += 1
+
+def invalidate_goal(goal_id: int):
+    """Drop a goal; its plans and tasks are dropped too since deletes cascade"""
+    _bump_generation()
+    goal_cache.pop(goal_id, None)
+    plan_cache.clear()
+    task_cache.clear()
+
+def invalidate_plan(plan_id: int, goal_id: int):
+    """Drop a plan, the goal that nests it, and any of its cached tasks"""
+    _bump_generation()
+    plan_cache.pop(plan_id, None)
+    goal_cache.pop(goal_id, None)
+    task_cache.clear()
+
+def invalidate_task(task_id: int, plan_id: int):
+    """Drop a task and every cached response that nests it"""
+    _bump_generation()
+    task_cache.pop(task_id, None)
+    plan_cache.pop(plan_id, None)
+    # Goal entries nest tasks but are keyed by goal id, which a task
+    # does not carry; writes are rare enough to clear them all
+    goal_cache.clear()
+
+def invalidate_all():
+    """Drop everything, for writes whose effects cross plans"""
+    _bump_generation()
+    goal_cache.clear()
+    plan_cache.clear()
+    task_cache.clear()
@@ -2,49 +2,114 @@
 Database configuration and connection management
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Async drivers for the sync URLs users may already have in their .env
+ASYNC_DRIVERS = {
+    "sqlite://": "sqlite+aiosqlite://",
+    "postgresql://": "postgresql+asyncpg://",
+    "postgres://": "postgresql+asyncpg://",
+}
+
+def to_async_url(url: str) -> str:
+    """Rewrite a sync database URL to use its async driver"""
+    for prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
 # Database URL from environment or default to SQLite
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./smart_task_planner.db")
+DATABASE_URL = to_async_url(os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./smart_task_planner.db"))
+
+# Connection pool sizing. Each worker process holds up to
+# DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so keep
+# (pool_size + max_overflow) * workers below Postgres max_connections.
+# pool_pre_ping stays off: its SELECT 1 leaves "idle in transaction"
+# connections behind PgBouncer in transaction mode.
+POOL_OPTIONS = {
+    "poolclass": AsyncAdaptedQueuePool,
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "20")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": False,
+}
+
+# Compiled SQL is cached per statement shape; the default of 500 entries is
+# raised so the per-endpoint queries are not evicted by one another
+QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "1200"))
 
-# Create engine
-engine = create_engine(
+if "sqlite" in DATABASE_URL:
+    CONNECT_ARGS = {"check_same_thread": False}
+elif "asyncpg" in DATABASE_URL:
+    # Server-side prepared statements kept per connection; set to 0 behind
+    # PgBouncer in transaction mode, which cannot route them
+    CONNECT_ARGS = {"prepared_statement_cache_size": int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))}
+else:
+    CONNECT_ARGS = {}
+
+# Create engine; in-memory SQLite keeps the dialect's default pool since
+# every pooled connection would open its own empty database
+engine = create_async_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    connect_args=CONNECT_ARGS,
+    query_cache_size=QUERY_CACHE_SIZE,
+    **({} if ":memory:" in DATABASE_URL else POOL_OPTIONS)
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# SQLite tuning, applied once per pooled connection: WAL lets readers run
+# alongside the single writer, and synchronous=NORMAL skips the fsync on
+# every commit (still durable across application crashes in WAL mode).
+# foreign_keys=ON makes SQLite honour the schema's ON DELETE rules, which
+# it otherwise ignores (jobs rely on them, having no ORM relationship)
+if "sqlite" in DATABASE_URL:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragma(dbapi_conn, _):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+# Create session factory; objects stay usable after commit so handlers can
+# return them without triggering a reload outside the event loop
+AsyncSessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 # Base class for models
 Base = declarative_base()
 
 # Database dependency
-def get_db():
+async def get_db():
     """Get database session"""
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # Initialize database
 async def init_db():
     """Initialize database tables"""
     from app.models import Base
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
 
 # Database connection manager
 class Database:
     def __init__(self):
         self.engine = engine
-        self.SessionLocal = SessionLocal
+        self.SessionLocal = AsyncSessionLocal
     
     async def connect(self):
         """Connect to database"""
@@ -52,7 +117,7 @@ class Database:
     
     async def disconnect(self):
         """Disconnect from database"""
-        self.engine.dispose()
+        await self.engine.dispose()
 
 # Global database instance
 database = Database()
@@ -0,0 +1,29 @@
+"""
+Shared FastAPI dependencies and request checks
+"""
+
+from fastapi import HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.models import Task
+from app.services.local_ai_service import LocalAIService
+
+def get_llm(request: Request) -> LocalAIService:
+    """Get the AI service created once per worker in the app lifespan"""
+    return request.app.state.llm
+
+async def check_dependency_ids(
+    db: AsyncSession, dependencies: Optional[List[int]], task_id: Optional[int] = None
+) -> List[int]:
+    """Sorted, de-duplicated dependency ids; 400 unless each names another existing task"""
+    ids = sorted(set(dependencies or []))
+    if task_id is not None and task_id in ids:
+        raise HTTPException(status_code=400, detail="A task cannot depend on itself")
+    if ids:
+        found = set((await db.scalars(select(Task.id).where(Task.id.in_(ids)))).all())
+        missing = [depends_on_id for depends_on_id in ids if depends_on_id not in found]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Unknown dependency task ids: {missing}")
+    return ids
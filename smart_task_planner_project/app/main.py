@@ -2,25 +2,51 @@
 Smart Task Planner - Main FastAPI Application
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from contextlib import asynccontextmanager
+from sqlalchemy.exc import SQLAlchemyError
 import uvicorn
+import hashlib
+import logging
 import os
 from dotenv import load_dotenv
 
-from app.database import init_db
-from app.routers import goals, tasks, plans
-from app.models import database
+from app.database import init_db, database
+from app.routers import goals, tasks, plans, batch
+from app.services.local_ai_service import LocalAIService
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+FALLBACK_HTML = b"""
+        <html>
+            <head><title>Smart Task Planner</title></head>
+            <body>
+                <h1>Smart Task Planner API</h1>
+                <p>API is running! Visit <a href="/docs">/docs</a> for API documentation.</p>
+            </body>
+        </html>
+        """
+
+def load_index_html() -> bytes:
+    """Read the web interface once; served from memory afterwards"""
+    try:
+        with open("static/index.html", "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return FALLBACK_HTML
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     await init_db()
+    app.state.llm = LocalAIService()
+    app.state.index_html = load_index_html()
+    app.state.index_etag = f'"{hashlib.sha1(app.state.index_html).hexdigest()}"'
     yield
     await database.disconnect()
 
@@ -28,7 +54,8 @@ app = FastAPI(
     title="Smart Task Planner",
     description="Break user goals into actionable tasks with timelines using AI reasoning",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -37,38 +64,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id", "ETag"],
 )
 
+@app.exception_handler(SQLAlchemyError)
+async def database_error_handler(request: Request, exc: SQLAlchemyError):
+    # The request's session rolls back when get_db closes it
+    logger.exception("Database error on %s %s", request.method, request.url.path, exc_info=exc)
+    return ORJSONResponse(status_code=500, content={"detail": "Database error"})
+
 app.include_router(goals.router, prefix="/api/goals", tags=["goals"])
 app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])
 app.include_router(plans.router, prefix="/api/plans", tags=["plans"])
+app.include_router(batch.router, prefix="/api/batch", tags=["batch"])
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 @app.get("/", response_class=HTMLResponse)
-async def read_root():
-    try:
-        with open("static/index.html", "r") as f:
-            return HTMLResponse(content=f.read())
-    except FileNotFoundError:
-        return HTMLResponse(content="""
-        <html>
-            <head><title>Smart Task Planner</title></head>
-            <body>
-                <h1>Smart Task Planner API</h1>
-                <p>API is running! Visit <a href="/docs">/docs</a> for API documentation.</p>
-            </body>
-        </html>
-        """)
+async def read_root(request: Request):
+    # no-cache lets browsers keep the page but revalidate it via the ETag
+    headers = {"ETag": request.app.state.index_etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == request.app.state.index_etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=request.app.state.index_html, headers=headers)
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "message": "Smart Task Planner API is running"}
 
 if __name__ == "__main__":
+    # Production entrypoint, one process per core:
+    #   gunicorn app.main:app -k uvicorn.workers.UvicornWorker \
+    #       -w $((2 * $(nproc) + 1)) --worker-tmp-dir /dev/shm
+    # loop/http "auto" pick uvloop and httptools (uvicorn[standard]) when installed
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="auto",
+        http="auto",
+        reload=False
     )
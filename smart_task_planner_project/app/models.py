@@ -2,13 +2,13 @@
 Database models for Smart Task Planner
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from typing import Optional, List, Dict, Any, Literal
+from pydantic import BaseModel, ConfigDict
 
 Base = declarative_base()
 
@@ -23,14 +23,15 @@ class Goal(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    # Relationships
-    plans = relationship("Plan", back_populates="goal", cascade="all, delete-orphan")
+    # Relationships never lazy load: handlers that return nested data ask for
+    # selectinload() explicitly, and an accidental N+1 fails loudly
+    plans = relationship("Plan", back_populates="goal", cascade="all, delete-orphan", lazy="raise_on_sql")
 
 class Plan(Base):
     __tablename__ = "plans"
     
     id = Column(Integer, primary_key=True, index=True)
-    goal_id = Column(Integer, ForeignKey("goals.id"), nullable=False)
+    goal_id = Column(Integer, ForeignKey("goals.id"), nullable=False, index=True)
     title = Column(String(255), nullable=False)
     description = Column(Text)
     estimated_duration_days = Column(Integer)
@@ -38,26 +39,63 @@ class Plan(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    goal = relationship("Goal", back_populates="plans")
-    tasks = relationship("Task", back_populates="plan", cascade="all, delete-orphan")
+    goal = relationship("Goal", back_populates="plans", lazy="raise_on_sql")
+    tasks = relationship("Task", back_populates="plan", cascade="all, delete-orphan", lazy="raise_on_sql")
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Serves plan_id lookups on its own and plan_id + status filters
+        Index("ix_task_plan_status", "plan_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     plan_id = Column(Integer, ForeignKey("plans.id"), nullable=False)
     title = Column(String(255), nullable=False)
     description = Column(Text)
-    priority = Column(String(20), default="medium")  # low, medium, high, urgent
-    status = Column(String(20), default="pending")  # pending, in_progress, completed, cancelled
+    priority = Column(String(20), default="medium", index=True)  # low, medium, high, urgent
+    status = Column(String(20), default="pending", index=True)  # pending, in_progress, completed, cancelled
     estimated_duration_hours = Column(Integer)
     due_date = Column(DateTime(timezone=True))
-    dependencies = Column(JSON)  # List of task IDs this task depends on
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    plan = relationship("Plan", back_populates="tasks")
+    plan = relationship("Plan", back_populates="tasks", lazy="raise_on_sql")
+    dependency_links = relationship(
+        "TaskDependency", foreign_keys="TaskDependency.task_id",
+        order_by="TaskDependency.depends_on_id",
+        cascade="all, delete-orphan", lazy="raise_on_sql"
+    )
+    # Links from tasks that depend on this one, removed along with it
+    dependent_links = relationship(
+        "TaskDependency", foreign_keys="TaskDependency.depends_on_id",
+        cascade="all, delete-orphan", lazy="raise_on_sql"
+    )
+    
+    @property
+    def dependencies(self) -> List[int]:
+        """IDs of the tasks this task depends on"""
+        return [link.depends_on_id for link in self.dependency_links]
+
+class TaskDependency(Base):
+    __tablename__ = "task_dependencies"
+    
+    # The primary key serves "what does task X depend on"; the depends_on_id
+    # index serves "which tasks depend on X"
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    depends_on_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    goal_id = Column(Integer, ForeignKey("goals.id", ondelete="CASCADE"), nullable=False, index=True)
+    plan_id = Column(Integer, ForeignKey("plans.id", ondelete="SET NULL"))
+    status = Column(String(20), default="pending")  # pending, running, completed, failed
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
 # Pydantic Models for API
 class GoalCreate(BaseModel):
@@ -72,8 +110,7 @@ class GoalResponse(BaseModel):
     user_input: str
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TaskCreate(BaseModel):
     title: str
@@ -94,8 +131,7 @@ class TaskResponse(BaseModel):
     dependencies: Optional[List[int]]
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PlanCreate(BaseModel):
     title: str
@@ -111,8 +147,7 @@ class PlanResponse(BaseModel):
     created_at: datetime
     tasks: List[TaskResponse] = []
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class GoalWithPlansResponse(BaseModel):
     id: int
@@ -122,17 +157,43 @@ class GoalWithPlansResponse(BaseModel):
     created_at: datetime
     plans: List[PlanResponse] = []
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TaskBreakdownRequest(BaseModel):
     goal: str
     timeline_weeks: Optional[int] = None
     additional_context: Optional[str] = None
 
+class JobResponse(BaseModel):
+    id: int
+    goal_id: int
+    plan_id: Optional[int]
+    status: str
+    error: Optional[str]
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class BatchCall(BaseModel):
+    method: Literal["GET"] = "GET"
+    path: str
+
+class BatchRequest(BaseModel):
+    pipeline: List[BatchCall]
+
+class BatchResult(BaseModel):
+    status: int
+    body: Any
+
 class TaskBreakdownResponse(BaseModel):
     goal_id: int
     plan_id: int
     tasks: List[TaskResponse]
     estimated_duration_days: int
     reasoning: str
+
+# Build the nested response validators at import rather than on first use
+TaskResponse.model_rebuild()
+PlanResponse.model_rebuild()
+GoalWithPlansResponse.model_rebuild()
+TaskBreakdownResponse.model_rebuild()
@@ -0,0 +1,34 @@
+"""
+Batch API router
+"""
+
+from fastapi import APIRouter, HTTPException, Request
+from typing import List
+import asyncio
+import httpx
+import orjson
+
+from app.models import BatchRequest, BatchResult
+
+router = APIRouter()
+
+MAX_BATCH_SIZE = 20
+
+@router.post("/", response_model=List[BatchResult])
+async def batch_requests(batch: BatchRequest, request: Request):
+    """Run several independent GET calls in one round-trip, results in request order"""
+    if len(batch.pipeline) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} calls per batch")
+    for call in batch.pipeline:
+        if not call.path.startswith("/api/") or call.path.startswith("/api/batch"):
+            raise HTTPException(status_code=400, detail=f"Path not allowed in a batch: {call.path}")
+    
+    # Sub-requests go straight to this app in-process, each with its own session
+    transport = httpx.ASGITransport(app=request.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://batch") as client:
+        responses = await asyncio.gather(*(client.get(call.path) for call in batch.pipeline))
+    
+    return [
+        BatchResult(status=response.status_code, body=orjson.loads(response.content) if response.content else None)
+        for response in responses
+    ]
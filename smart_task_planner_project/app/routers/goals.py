@@ -2,91 +2,95 @@
 Goals API router
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
 from datetime import datetime
 
 from app.database import get_db
-from app.models import Goal, GoalCreate, GoalResponse, GoalWithPlansResponse
-from app.services.local_ai_service import LocalAIService
+from app.cache import goal_cache, cache_generation, cache_put, invalidate_goal
+from app.models import Goal, Plan, Task, GoalCreate, GoalResponse, GoalWithPlansResponse
 
 router = APIRouter()
-llm_service = LocalAIService()
 
 @router.post("/", response_model=GoalResponse)
-async def create_goal(goal: GoalCreate, db: Session = Depends(get_db)):
+async def create_goal(goal: GoalCreate, db: AsyncSession = Depends(get_db)):
     """Create a new goal"""
-    try:
-        db_goal = Goal(
-            title=goal.title,
-            description=goal.description,
-            user_input=goal.user_input
-        )
-        db.add(db_goal)
-        db.commit()
-        db.refresh(db_goal)
-        return db_goal
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error creating goal: {str(e)}")
+    db_goal = Goal(
+        title=goal.title,
+        description=goal.description,
+        user_input=goal.user_input
+    )
+    db.add(db_goal)
+    await db.commit()
+    return db_goal
 
-@router.get("/", response_model=List[GoalResponse])
-async def get_goals(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all goals"""
-    try:
-        goals = db.query(Goal).offset(skip).limit(limit).all()
-        return goals
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching goals: {str(e)}")
+@router.get("/", response_model=List[GoalResponse], response_model_exclude_unset=True)
+async def get_goals(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get goals in id order, one keyset page after `after_id`"""
+    query = select(Goal).order_by(Goal.id).limit(limit)
+    if after_id is not None:
+        query = query.where(Goal.id > after_id)
+    
+    goals = (await db.scalars(query)).all()
+    if goals and len(goals) == limit:
+        # Full page: hand the client the keyset cursor for the next one
+        response.headers["X-Next-After-Id"] = str(goals[-1].id)
+    return goals
 
 @router.get("/{goal_id}", response_model=GoalWithPlansResponse)
-async def get_goal(goal_id: int, db: Session = Depends(get_db)):
+async def get_goal(goal_id: int, db: AsyncSession = Depends(get_db)):
     """Get a specific goal with its plans"""
-    try:
-        goal = db.query(Goal).filter(Goal.id == goal_id).first()
-        if not goal:
-            raise HTTPException(status_code=404, detail="Goal not found")
-        return goal
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching goal: {str(e)}")
+    cached = goal_cache.get(goal_id)
+    if cached is not None:
+        return cached
+    
+    generation = cache_generation()
+    goal = await db.get(
+        Goal, goal_id, options=[
+            selectinload(Goal.plans).selectinload(Plan.tasks).selectinload(Task.dependency_links)
+        ]
+    )
+    if not goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    
+    return cache_put(goal_cache, goal_id, GoalWithPlansResponse.model_validate(goal).model_dump(), generation)
 
 @router.delete("/{goal_id}")
-async def delete_goal(goal_id: int, db: Session = Depends(get_db)):
+async def delete_goal(goal_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a goal and all its associated plans and tasks"""
-    try:
-        goal = db.query(Goal).filter(Goal.id == goal_id).first()
-        if not goal:
-            raise HTTPException(status_code=404, detail="Goal not found")
-        
-        db.delete(goal)
-        db.commit()
-        return {"message": "Goal deleted successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error deleting goal: {str(e)}")
+    goal = await db.get(Goal, goal_id)
+    if not goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    
+    await db.delete(goal)
+    await db.commit()
+    invalidate_goal(goal_id)
+    return {"message": "Goal deleted successfully"}
 
 @router.put("/{goal_id}", response_model=GoalResponse)
-async def update_goal(goal_id: int, goal_update: GoalCreate, db: Session = Depends(get_db)):
+async def update_goal(goal_id: int, goal_update: GoalCreate, db: AsyncSession = Depends(get_db)):
     """Update a goal"""
-    try:
-        goal = db.query(Goal).filter(Goal.id == goal_id).first()
-        if not goal:
-            raise HTTPException(status_code=404, detail="Goal not found")
-        
-        goal.title = goal_update.title
-        goal.description = goal_update.description
-        goal.user_input = goal_update.user_input
-        
-        db.commit()
-        db.refresh(goal)
-        return goal
-    except HTTPException:
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error updating goal: {str(e)}")
+    goal = await db.scalar(
+        update(Goal)
+        .where(Goal.id == goal_id)
+        .values(
+            title=goal_update.title,
+            description=goal_update.description,
+            user_input=goal_update.user_input
+        )
+        .returning(Goal)
+    )
+    if not goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    
+    await db.commit()
+    invalidate_goal(goal_id)
+    return goal
@@ -2,167 +2,249 @@
 Plans API router - handles task breakdown generation
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
 from datetime import datetime, timedelta
 
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
+from app.cache import plan_cache, cache_generation, cache_put, invalidate_plan
 from app.models import (
-    Plan, Task, Goal, PlanCreate, PlanResponse, 
+    Plan, Task, TaskDependency, Goal, Job, PlanCreate, PlanResponse, JobResponse,
     TaskBreakdownRequest, TaskBreakdownResponse, TaskCreate
 )
+from app.dependencies import get_llm, check_dependency_ids
 from app.services.local_ai_service import LocalAIService
 
 router = APIRouter()
-llm_service = LocalAIService()
+
+def _new_goal(request: TaskBreakdownRequest) -> Goal:
+    """Build the goal row for a task breakdown request"""
+    return Goal(
+        title=f"Goal: {request.goal[:50]}...",
+        description=request.additional_context,
+        user_input=request.goal
+    )
+
+async def _create_plan(db: AsyncSession, goal_id: int, request: TaskBreakdownRequest, llm: LocalAIService):
+    """Run the LLM breakdown for a goal and store the plan and its tasks"""
+    # Generate task breakdown using LLM
+    llm_response = await llm.generate_task_breakdown(
+        goal=request.goal,
+        timeline_weeks=request.timeline_weeks,
+        additional_context=request.additional_context
+    )
+    
+    # Create the plan
+    plan = Plan(
+        goal_id=goal_id,
+        title=f"Plan for: {request.goal[:50]}...",
+        description=f"AI-generated plan with {len(llm_response['tasks'])} tasks",
+        estimated_duration_days=llm_response.get('estimated_duration_days', 30)
+    )
+    db.add(plan)
+    await db.commit()
+    
+    # Create tasks with one executemany INSERT ... RETURNING, which hands
+    # back the ids and server defaults without a SELECT per task. Postgres
+    # batches the rows into one statement; SQLite cannot promise RETURNING
+    # order for a batch, so SQLAlchemy sends it a statement per row there
+    start_date = datetime.now()
+    rows = [
+        {
+            "plan_id": plan.id,
+            "title": task_data['title'],
+            "description": task_data.get('description', ''),
+            "priority": task_data.get('priority', 'medium'),
+            "estimated_duration_hours": task_data.get('estimated_duration_hours', 8),
+            # Calculate due date based on offset
+            "due_date": start_date + timedelta(days=task_data.get('due_date_offset_days', i * 2)),
+        }
+        for i, task_data in enumerate(llm_response['tasks'])
+    ]
+    
+    created_tasks = (await db.scalars(
+        insert(Task)
+        .returning(Task, sort_by_parameter_order=True)
+        .options(selectinload(Task.dependency_links)),
+        rows
+    )).all()
+    
+    # The LLM refers to dependencies by position in its task list
+    for task, task_data in zip(created_tasks, llm_response['tasks']):
+        for index in sorted(set(task_data.get('dependencies', []))):
+            if 0 <= index < len(created_tasks):
+                task.dependency_links.append(TaskDependency(depends_on_id=created_tasks[index].id))
+    await db.commit()
+    return plan, created_tasks, llm_response
+
+async def _run_plan_job(job_id: int, request: TaskBreakdownRequest, llm: LocalAIService):
+    """Background half of POST /jobs: build the plan and record the outcome"""
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Job, job_id)
+        job.status = "running"
+        await db.commit()
+        
+        try:
+            plan, _, _ = await _create_plan(db, job.goal_id, request, llm)
+            job.plan_id = plan.id
+            job.status = "completed"
+        except Exception as e:
+            await db.rollback()
+            job.status = "failed"
+            job.error = str(e)
+        await db.commit()
+        # The goal may have been fetched and cached while the job ran
+        invalidate_plan(job.plan_id, job.goal_id)
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def start_plan_job(
+    request: TaskBreakdownRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    llm: LocalAIService = Depends(get_llm)
+):
+    """
+    Queue a task breakdown; poll GET /jobs/{job_id} until it completes
+    """
+    goal = _new_goal(request)
+    job = Job(status="pending")
+    db.add(goal)
+    await db.flush()
+    job.goal_id = goal.id
+    db.add(job)
+    await db.commit()
+    
+    # Runs after the 202 is sent, on its own session, so neither this
+    # request's worker nor its pooled connection waits on the LLM
+    background_tasks.add_task(_run_plan_job, job.id, request, llm)
+    return job
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_plan_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Get the status of a plan generation job"""
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/preview")
+async def preview_task_plan(
+    request: TaskBreakdownRequest,
+    llm: LocalAIService = Depends(get_llm)
+):
+    """
+    Preview a task breakdown without saving it; dependencies are task positions
+    """
+    payload = await llm.generate_task_breakdown_bytes(
+        goal=request.goal,
+        timeline_weeks=request.timeline_weeks,
+        additional_context=request.additional_context
+    )
+    return Response(content=payload, media_type="application/json")
 
 @router.post("/generate", response_model=TaskBreakdownResponse)
-async def generate_task_plan(request: TaskBreakdownRequest, db: Session = Depends(get_db)):
+async def generate_task_plan(
+    request: TaskBreakdownRequest,
+    db: AsyncSession = Depends(get_db),
+    llm: LocalAIService = Depends(get_llm)
+):
     """
     Generate a task breakdown plan for a goal using LLM reasoning
     """
-    try:
-        # Create the goal first
-        goal = Goal(
-            title=f"Goal: {request.goal[:50]}...",
-            description=request.additional_context,
-            user_input=request.goal
-        )
-        db.add(goal)
-        db.commit()
-        db.refresh(goal)
-        
-        # Generate task breakdown using LLM
-        llm_response = await llm_service.generate_task_breakdown(
-            goal=request.goal,
-            timeline_weeks=request.timeline_weeks,
-            additional_context=request.additional_context
-        )
-        
-        # Create the plan
-        plan = Plan(
-            goal_id=goal.id,
-            title=f"Plan for: {request.goal[:50]}...",
-            description=f"AI-generated plan with {len(llm_response['tasks'])} tasks",
-            estimated_duration_days=llm_response.get('estimated_duration_days', 30)
-        )
-        db.add(plan)
-        db.commit()
-        db.refresh(plan)
-        
-        # Create tasks
-        created_tasks = []
-        start_date = datetime.now()
-        
-        for i, task_data in enumerate(llm_response['tasks']):
-            # Calculate due date based on offset
-            due_date_offset = task_data.get('due_date_offset_days', i * 2)
-            due_date = start_date + timedelta(days=due_date_offset)
-            
-            task = Task(
-                plan_id=plan.id,
-                title=task_data['title'],
-                description=task_data.get('description', ''),
-                priority=task_data.get('priority', 'medium'),
-                estimated_duration_hours=task_data.get('estimated_duration_hours', 8),
-                due_date=due_date,
-                dependencies=task_data.get('dependencies', [])
-            )
-            db.add(task)
-            created_tasks.append(task)
-        
-        db.commit()
-        
-        # Refresh all tasks to get their IDs
-        for task in created_tasks:
-            db.refresh(task)
-        
-        return TaskBreakdownResponse(
-            goal_id=goal.id,
-            plan_id=plan.id,
-            tasks=created_tasks,
-            estimated_duration_days=plan.estimated_duration_days,
-            reasoning=llm_response.get('reasoning', 'No reasoning provided')
-        )
-        
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error generating task plan: {str(e)}")
+    # Create the goal first
+    goal = _new_goal(request)
+    db.add(goal)
+    await db.commit()
+    
+    plan, created_tasks, llm_response = await _create_plan(db, goal.id, request, llm)
+    
+    return TaskBreakdownResponse(
+        goal_id=goal.id,
+        plan_id=plan.id,
+        tasks=created_tasks,
+        estimated_duration_days=plan.estimated_duration_days,
+        reasoning=llm_response.get('reasoning', 'No reasoning provided')
+    )
 
-@router.get("/", response_model=List[PlanResponse])
-async def get_plans(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all plans"""
-    try:
-        plans = db.query(Plan).offset(skip).limit(limit).all()
-        return plans
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching plans: {str(e)}")
+@router.get("/", response_model=List[PlanResponse], response_model_exclude_unset=True)
+async def get_plans(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get plans in id order, one keyset page after `after_id`"""
+    query = (
+        select(Plan)
+        .options(selectinload(Plan.tasks).selectinload(Task.dependency_links))
+        .order_by(Plan.id)
+        .limit(limit)
+    )
+    if after_id is not None:
+        query = query.where(Plan.id > after_id)
+    
+    plans = (await db.scalars(query)).all()
+    if plans and len(plans) == limit:
+        # Full page: hand the client the keyset cursor for the next one
+        response.headers["X-Next-After-Id"] = str(plans[-1].id)
+    return plans
 
 @router.get("/{plan_id}", response_model=PlanResponse)
-async def get_plan(plan_id: int, db: Session = Depends(get_db)):
+async def get_plan(plan_id: int, db: AsyncSession = Depends(get_db)):
     """Get a specific plan with its tasks"""
-    try:
-        plan = db.query(Plan).filter(Plan.id == plan_id).first()
-        if not plan:
-            raise HTTPException(status_code=404, detail="Plan not found")
-        return plan
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching plan: {str(e)}")
+    cached = plan_cache.get(plan_id)
+    if cached is not None:
+        return cached
+    
+    generation = cache_generation()
+    plan = await db.get(Plan, plan_id, options=[selectinload(Plan.tasks).selectinload(Task.dependency_links)])
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    
+    return cache_put(plan_cache, plan_id, PlanResponse.model_validate(plan).model_dump(), generation)
 
-@router.get("/goal/{goal_id}", response_model=List[PlanResponse])
-async def get_plans_by_goal(goal_id: int, db: Session = Depends(get_db)):
+@router.get("/goal/{goal_id}", response_model=List[PlanResponse], response_model_exclude_unset=True)
+async def get_plans_by_goal(goal_id: int, db: AsyncSession = Depends(get_db)):
     """Get all plans for a specific goal"""
-    try:
-        plans = db.query(Plan).filter(Plan.goal_id == goal_id).all()
-        return plans
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching plans: {str(e)}")
+    plans = (await db.scalars(
+        select(Plan).where(Plan.goal_id == goal_id).options(selectinload(Plan.tasks).selectinload(Task.dependency_links))
+    )).all()
+    return plans
 
 @router.post("/{plan_id}/tasks", response_model=PlanResponse)
-async def add_task_to_plan(plan_id: int, task: TaskCreate, db: Session = Depends(get_db)):
+async def add_task_to_plan(plan_id: int, task: TaskCreate, db: AsyncSession = Depends(get_db)):
     """Add a new task to an existing plan"""
-    try:
-        plan = db.query(Plan).filter(Plan.id == plan_id).first()
-        if not plan:
-            raise HTTPException(status_code=404, detail="Plan not found")
-        
-        new_task = Task(
-            plan_id=plan_id,
-            title=task.title,
-            description=task.description,
-            priority=task.priority,
-            estimated_duration_hours=task.estimated_duration_hours,
-            due_date=task.due_date,
-            dependencies=task.dependencies or []
-        )
-        
-        db.add(new_task)
-        db.commit()
-        db.refresh(plan)
-        return plan
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error adding task: {str(e)}")
+    plan = await db.get(Plan, plan_id, options=[selectinload(Plan.tasks).selectinload(Task.dependency_links)])
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    dependency_ids = await check_dependency_ids(db, task.dependencies)
+    
+    new_task = Task(
+        title=task.title,
+        description=task.description,
+        priority=task.priority,
+        estimated_duration_hours=task.estimated_duration_hours,
+        due_date=task.due_date,
+        dependency_links=[TaskDependency(depends_on_id=depends_on_id) for depends_on_id in dependency_ids]
+    )
+    
+    # Appending to the already loaded collection avoids reloading it
+    plan.tasks.append(new_task)
+    await db.commit()
+    invalidate_plan(plan_id, plan.goal_id)
+    return plan
 
 @router.delete("/{plan_id}")
-async def delete_plan(plan_id: int, db: Session = Depends(get_db)):
+async def delete_plan(plan_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a plan and all its tasks"""
-    try:
-        plan = db.query(Plan).filter(Plan.id == plan_id).first()
-        if not plan:
-            raise HTTPException(status_code=404, detail="Plan not found")
-        
-        db.delete(plan)
-        db.commit()
-        return {"message": "Plan deleted successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error deleting plan: {str(e)}")
+    plan = await db.get(Plan, plan_id)
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    
+    await db.delete(plan)
+    await db.commit()
+    invalidate_plan(plan_id, plan.goal_id)
+    return {"message": "Plan deleted successfully"}
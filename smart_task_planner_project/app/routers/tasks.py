@@ -2,176 +2,235 @@
 Tasks API router
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Dict, List, Optional
+import hashlib
+import orjson
 
 from app.database import get_db
-from app.models import Task, TaskResponse, TaskCreate
+from app.cache import task_cache, cache_generation, cache_put, invalidate_task, invalidate_all
+from app.models import Task, TaskDependency, TaskResponse, TaskCreate
+from app.dependencies import get_llm, check_dependency_ids
 from app.services.local_ai_service import LocalAIService
 
 router = APIRouter()
-llm_service = LocalAIService()
 
-@router.get("/", response_model=List[TaskResponse])
+def _task_etag(task: dict, variant: str = "") -> str:
+    """Strong ETag over a task's serialized fields, so any change shows"""
+    return f'"{hashlib.sha1(variant.encode() + orjson.dumps(task)).hexdigest()}"'
+
+async def _load_task_dict(task_id: int, db: AsyncSession) -> dict:
+    """A task's response fields, from task_cache or loaded (and cached) once"""
+    task = task_cache.get(task_id)
+    if task is None:
+        generation = cache_generation()
+        row = await db.get(Task, task_id, options=[selectinload(Task.dependency_links)])
+        if not row:
+            raise HTTPException(status_code=404, detail="Task not found")
+        task = cache_put(task_cache, task_id, TaskResponse.model_validate(row).model_dump(), generation)
+    return task
+
+def _not_modified(task: dict, request: Request, response: Response, variant: str = "") -> Optional[Response]:
+    """Set the ETag; a bodiless 304 to return when If-None-Match still matches"""
+    etag = _task_etag(task, variant)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
+
+@router.get("/", response_model=List[TaskResponse], response_model_exclude_unset=True)
 async def get_tasks(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1), 
     status: Optional[str] = None,
     priority: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get tasks with optional filtering"""
+    """Get tasks with optional filtering, one keyset page after `after_id`"""
+    query = select(Task).options(selectinload(Task.dependency_links)).order_by(Task.id).limit(limit)
+    
+    if after_id is not None:
+        query = query.where(Task.id > after_id)
+    if status:
+        query = query.where(Task.status == status)
+    if priority:
+        query = query.where(Task.priority == priority)
+    
+    tasks = (await db.scalars(query)).all()
+    if tasks and len(tasks) == limit:
+        # Full page: hand the client the keyset cursor for the next one
+        response.headers["X-Next-After-Id"] = str(tasks[-1].id)
+    return tasks
+
+# Declared before /{task_id} so "by-plans" is not parsed as a task id
+@router.get("/by-plans", response_model=Dict[int, List[TaskResponse]], response_model_exclude_unset=True)
+async def get_tasks_by_plans(plan_ids: str, db: AsyncSession = Depends(get_db)):
+    """Get the tasks of several plans in one query, keyed by plan id"""
     try:
-        query = db.query(Task)
-        
-        if status:
-            query = query.filter(Task.status == status)
-        if priority:
-            query = query.filter(Task.priority == priority)
-        
-        tasks = query.offset(skip).limit(limit).all()
-        return tasks
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching tasks: {str(e)}")
+        ids = [int(plan_id) for plan_id in plan_ids.split(",") if plan_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="plan_ids must be comma-separated integers")
+    
+    tasks = (await db.scalars(
+        select(Task)
+        .where(Task.plan_id.in_(ids))
+        .options(selectinload(Task.dependency_links))
+        .order_by(Task.id)
+    )).all()
+    
+    grouped = {plan_id: [] for plan_id in ids}
+    for task in tasks:
+        grouped[task.plan_id].append(task)
+    return grouped
 
 @router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: int, db: Session = Depends(get_db)):
-    """Get a specific task"""
-    try:
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
-        return task
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching task: {str(e)}")
+async def get_task(task_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    """Get a specific task; answers 304 when If-None-Match still matches"""
+    task = await _load_task_dict(task_id, db)
+    return _not_modified(task, request, response) or task
 
 @router.put("/{task_id}/status")
-async def update_task_status(task_id: int, status: str, db: Session = Depends(get_db)):
+async def update_task_status(task_id: int, status: str, db: AsyncSession = Depends(get_db)):
     """Update task status"""
-    try:
-        valid_statuses = ["pending", "in_progress", "completed", "cancelled"]
-        if status not in valid_statuses:
-            raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
-        
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
-        
-        task.status = status
-        if status == "completed":
-            task.updated_at = datetime.now()
-        
-        db.commit()
-        return {"message": f"Task status updated to {status}"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error updating task status: {str(e)}")
+    valid_statuses = ["pending", "in_progress", "completed", "cancelled"]
+    if status not in valid_statuses:
+        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
+    
+    # Single UPDATE ... RETURNING; no row back means no such task.
+    # updated_at is set by the column's onupdate=func.now()
+    plan_id = await db.scalar(
+        update(Task).where(Task.id == task_id).values(status=status).returning(Task.plan_id)
+    )
+    if plan_id is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    await db.commit()
+    invalidate_task(task_id, plan_id)
+    return {"message": f"Task status updated to {status}"}
 
 @router.put("/{task_id}/priority")
-async def update_task_priority(task_id: int, priority: str, db: Session = Depends(get_db)):
+async def update_task_priority(task_id: int, priority: str, db: AsyncSession = Depends(get_db)):
     """Update task priority"""
-    try:
-        valid_priorities = ["low", "medium", "high", "urgent"]
-        if priority not in valid_priorities:
-            raise HTTPException(status_code=400, detail=f"Invalid priority. Must be one of: {valid_priorities}")
-        
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
-        
-        task.priority = priority
-        db.commit()
-        return {"message": f"Task priority updated to {priority}"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error updating task priority: {str(e)}")
+    valid_priorities = ["low", "medium", "high", "urgent"]
+    if priority not in valid_priorities:
+        raise HTTPException(status_code=400, detail=f"Invalid priority. Must be one of: {valid_priorities}")
+    
+    plan_id = await db.scalar(
+        update(Task).where(Task.id == task_id).values(priority=priority).returning(Task.plan_id)
+    )
+    if plan_id is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    await db.commit()
+    invalidate_task(task_id, plan_id)
+    return {"message": f"Task priority updated to {priority}"}
 
 @router.put("/{task_id}", response_model=TaskResponse)
-async def update_task(task_id: int, task_update: TaskCreate, db: Session = Depends(get_db)):
+async def update_task(task_id: int, task_update: TaskCreate, db: AsyncSession = Depends(get_db)):
     """Update a task"""
-    try:
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
-        
-        task.title = task_update.title
-        task.description = task_update.description
-        task.priority = task_update.priority
-        task.estimated_duration_hours = task_update.estimated_duration_hours
-        task.due_date = task_update.due_date
-        task.dependencies = task_update.dependencies or []
-        
-        db.commit()
-        db.refresh(task)
-        return task
-    except HTTPException:
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error updating task: {str(e)}")
+    dependency_ids = await check_dependency_ids(db, task_update.dependencies, task_id)
+    task = await db.scalar(
+        update(Task)
+        .where(Task.id == task_id)
+        .values(
+            title=task_update.title,
+            description=task_update.description,
+            priority=task_update.priority,
+            estimated_duration_hours=task_update.estimated_duration_hours,
+            due_date=task_update.due_date
+        )
+        .returning(Task)
+        .options(selectinload(Task.dependency_links))
+    )
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    # Flush the removals first: a link that is kept would otherwise be
+    # inserted again before its old row is deleted
+    task.dependency_links.clear()
+    await db.flush()
+    task.dependency_links.extend(
+        TaskDependency(depends_on_id=depends_on_id) for depends_on_id in dependency_ids
+    )
+    await db.commit()
+    invalidate_task(task_id, task.plan_id)
+    return task
 
 @router.delete("/{task_id}")
-async def delete_task(task_id: int, db: Session = Depends(get_db)):
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a task"""
-    try:
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
-        
-        db.delete(task)
-        db.commit()
-        return {"message": "Task deleted successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error deleting task: {str(e)}")
+    task = await db.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    await db.delete(task)
+    await db.commit()
+    # Tasks in any plan may have depended on this one and lost the link
+    invalidate_all()
+    return {"message": "Task deleted successfully"}
 
 @router.get("/{task_id}/suggestions")
-async def get_task_suggestions(task_id: int, db: Session = Depends(get_db)):
+async def get_task_suggestions(
+    task_id: int,
+    db: AsyncSession = Depends(get_db),
+    llm: LocalAIService = Depends(get_llm)
+):
     """Get AI-powered suggestions for improving a task"""
-    try:
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
-        
-        context = f"Priority: {task.priority}, Estimated duration: {task.estimated_duration_hours} hours"
-        suggestions = await llm_service.generate_task_suggestions(task.title, context)
-        
-        return {"suggestions": suggestions}
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating suggestions: {str(e)}")
+    task = await db.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    context = f"Priority: {task.priority}, Estimated duration: {task.estimated_duration_hours} hours"
+    suggestions = await llm.generate_task_suggestions(task.title, context)
+    
+    return {"suggestions": suggestions}
 
 @router.get("/{task_id}/analysis")
-async def analyze_task(task_id: int, db: Session = Depends(get_db)):
+async def analyze_task(
+    task_id: int,
+    db: AsyncSession = Depends(get_db),
+    llm: LocalAIService = Depends(get_llm)
+):
     """Get AI analysis of task complexity and requirements"""
-    try:
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
-        
-        analysis = await llm_service.analyze_task_complexity(task.title)
-        return analysis
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing task: {str(e)}")
-
-@router.get("/plan/{plan_id}", response_model=List[TaskResponse])
-async def get_tasks_by_plan(plan_id: int, db: Session = Depends(get_db)):
+    task = await db.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    analysis = await llm.analyze_task_complexity(task.title)
+    return analysis
+
+@router.get("/{task_id}/bundle")
+async def get_task_bundle(
+    task_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    llm: LocalAIService = Depends(get_llm)
+):
+    """Get a task with its suggestions and analysis, loading the task once"""
+    task = await _load_task_dict(task_id, db)
+    
+    # Suggestions and analysis follow from the task alone, so its fields
+    # decide whether the whole bundle is unchanged
+    not_modified = _not_modified(task, request, response, "bundle")
+    if not_modified:
+        return not_modified
+    
+    context = f"Priority: {task['priority']}, Estimated duration: {task['estimated_duration_hours']} hours"
+    return {
+        "task": task,
+        "suggestions": await llm.generate_task_suggestions(task["title"], context),
+        "analysis": await llm.analyze_task_complexity(task["title"]),
+    }
+
+@router.get("/plan/{plan_id}", response_model=List[TaskResponse], response_model_exclude_unset=True)
+async def get_tasks_by_plan(plan_id: int, db: AsyncSession = Depends(get_db)):
     """Get all tasks for a specific plan"""
-    try:
-        tasks = db.query(Task).filter(Task.plan_id == plan_id).all()
-        return tasks
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching tasks: {str(e)}")
+    tasks = (await db.scalars(
+        select(Task).where(Task.plan_id == plan_id).options(selectinload(Task.dependency_links))
+    )).all()
+    return tasks
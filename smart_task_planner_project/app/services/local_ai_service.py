@@ -4,128 +4,310 @@ Uses rule-based logic and templates to generate task breakdowns
 """
 
 import json
-import re
+import sys
+import orjson
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+from functools import lru_cache
+from types import MappingProxyType
 import random
 
+try:
+    import ahocorasick  # pyahocorasick, optional
+except ImportError:
+    ahocorasick = None
+
+# Task title flags used by the dependency rules
+IMPLEMENT_TASK = 1  # "implement" or "develop"
+TEST_TASK = 2       # "test"
+TESTING_TASK = 4    # "testing"
+DEPLOY_TASK = 8     # "deploy"
+
+# Task complexity profiles, first keyword match wins:
+# (keywords, complexity, estimated hours, required skills)
+COMPLEXITY_TABLE = (
+    (frozenset({"research", "plan", "setup", "configure"}), "low", 4,
+     ("Research", "Planning", "Basic technical skills")),
+    (frozenset({"implement", "develop", "build", "create"}), "high", 16,
+     ("Programming", "System design", "Problem solving")),
+    (frozenset({"test", "validate", "review"}), "medium", 8,
+     ("Testing", "Quality assurance", "Attention to detail")),
+)
+DEFAULT_COMPLEXITY = ("medium", 8, ("General project management", "Communication"))
+TASK_CHALLENGES = (
+    "Time estimation accuracy",
+    "Resource availability",
+    "Technical complexity",
+    "External dependencies"
+)
+
+# Closing sentences shared by every reasoning text
+REASONING_NOTES = " ".join((
+    "Tasks are ordered logically with dependencies to ensure smooth progression.",
+    "Priority levels are assigned based on importance and dependencies.",
+    "Time estimates are realistic and account for potential challenges."
+))
+
+# Fallback plan used when the main logic fails:
+# (title, description, priority, hours, dependencies, due date offset in days)
+FALLBACK_TASKS = (
+    ("Plan and Research {goal}", "Research and plan the approach for {goal}", "high", 8, (), 0),
+    ("Implement Core Features for {goal}", "Implement the main functionality for {goal}", "high", 16, (0,), 2),
+    ("Test and Validate {goal}", "Test the implementation of {goal}", "medium", 8, (1,), 4),
+    ("Deploy and Launch {goal}", "Deploy and launch {goal}", "high", 4, (2,), 6),
+)
+
+# Read-only tables shared by every LocalAIService instance
+
+# Task templates for different types of goals
+TASK_TEMPLATES = MappingProxyType({
+    "product_launch": [
+        {"title": "Market Research and Analysis", "duration": 16, "priority": "high"},
+        {"title": "Define Product Requirements", "duration": 12, "priority": "high"},
+        {"title": "Create Project Timeline", "duration": 4, "priority": "high"},
+        {"title": "Set up Development Environment", "duration": 8, "priority": "high"},
+        {"title": "Design User Interface", "duration": 20, "priority": "medium"},
+        {"title": "Implement Core Features", "duration": 40, "priority": "high"},
+        {"title": "Write Unit Tests", "duration": 16, "priority": "medium"},
+        {"title": "Integration Testing", "duration": 12, "priority": "medium"},
+        {"title": "User Acceptance Testing", "duration": 8, "priority": "medium"},
+        {"title": "Deploy to Production", "duration": 8, "priority": "high"},
+        {"title": "Create Documentation", "duration": 12, "priority": "low"},
+        {"title": "Marketing and Promotion", "duration": 16, "priority": "medium"}
+    ],
+    "learning": [
+        {"title": "Research Learning Resources", "duration": 4, "priority": "high"},
+        {"title": "Set Learning Goals", "duration": 2, "priority": "high"},
+        {"title": "Create Study Schedule", "duration": 2, "priority": "high"},
+        {"title": "Complete Basic Tutorials", "duration": 16, "priority": "high"},
+        {"title": "Practice with Small Projects", "duration": 24, "priority": "medium"},
+        {"title": "Join Learning Community", "duration": 4, "priority": "low"},
+        {"title": "Build Portfolio Project", "duration": 32, "priority": "medium"},
+        {"title": "Seek Feedback and Mentorship", "duration": 8, "priority": "medium"},
+        {"title": "Advanced Practice", "duration": 20, "priority": "medium"},
+        {"title": "Document Learning Journey", "duration": 4, "priority": "low"}
+    ],
+    "event_planning": [
+        {"title": "Define Event Objectives", "duration": 4, "priority": "high"},
+        {"title": "Set Budget and Timeline", "duration": 4, "priority": "high"},
+        {"title": "Choose Venue and Date", "duration": 8, "priority": "high"},
+        {"title": "Create Guest List", "duration": 4, "priority": "medium"},
+        {"title": "Send Invitations", "duration": 4, "priority": "medium"},
+        {"title": "Plan Activities and Agenda", "duration": 12, "priority": "medium"},
+        {"title": "Arrange Catering", "duration": 6, "priority": "medium"},
+        {"title": "Set up Equipment and Decorations", "duration": 8, "priority": "low"},
+        {"title": "Coordinate with Vendors", "duration": 6, "priority": "medium"},
+        {"title": "Final Preparations", "duration": 4, "priority": "high"},
+        {"title": "Execute Event", "duration": 8, "priority": "high"},
+        {"title": "Follow-up and Feedback", "duration": 4, "priority": "low"}
+    ],
+    "business_startup": [
+        {"title": "Market Research and Validation", "duration": 20, "priority": "high"},
+        {"title": "Create Business Plan", "duration": 16, "priority": "high"},
+        {"title": "Register Business Entity", "duration": 4, "priority": "high"},
+        {"title": "Set up Financial Systems", "duration": 8, "priority": "high"},
+        {"title": "Develop MVP (Minimum Viable Product)", "duration": 60, "priority": "high"},
+        {"title": "Build Brand Identity", "duration": 12, "priority": "medium"},
+        {"title": "Create Marketing Strategy", "duration": 16, "priority": "medium"},
+        {"title": "Launch Website", "duration": 20, "priority": "medium"},
+        {"title": "Find First Customers", "duration": 24, "priority": "high"},
+        {"title": "Gather Customer Feedback", "duration": 8, "priority": "medium"},
+        {"title": "Iterate and Improve", "duration": 20, "priority": "medium"},
+        {"title": "Scale Operations", "duration": 32, "priority": "low"}
+    ],
+    "mobile_app": [
+        {"title": "Define App Requirements", "duration": 8, "priority": "high"},
+        {"title": "Create Wireframes and Mockups", "duration": 16, "priority": "high"},
+        {"title": "Set up Development Environment", "duration": 6, "priority": "high"},
+        {"title": "Implement User Authentication", "duration": 12, "priority": "high"},
+        {"title": "Develop Core Features", "duration": 40, "priority": "high"},
+        {"title": "Integrate APIs and Backend", "duration": 20, "priority": "medium"},
+        {"title": "Implement UI/UX Design", "duration": 24, "priority": "medium"},
+        {"title": "Testing and Bug Fixes", "duration": 16, "priority": "medium"},
+        {"title": "Performance Optimization", "duration": 12, "priority": "medium"},
+        {"title": "Prepare for App Store", "duration": 8, "priority": "high"},
+        {"title": "Submit for Review", "duration": 2, "priority": "high"},
+        {"title": "Launch and Marketing", "duration": 16, "priority": "medium"}
+    ]
+})
+
+def _template_columns(tasks: List[Dict]) -> Dict[str, tuple]:
+    """Turn a template's task dicts into per-field tuples"""
+    # Interned so titles repeated across templates share one string
+    return {
+        "titles": tuple(sys.intern(task["title"]) for task in tasks),
+        "titles_lower": tuple(sys.intern(task["title"].lower()) for task in tasks),
+        "durations": tuple(task["duration"] for task in tasks),
+        "priorities": tuple(sys.intern(task["priority"]) for task in tasks),
+    }
+
+# The templates stored column-wise: one tuple per field
+TEMPLATE_COLUMNS = MappingProxyType({
+    goal_type: _template_columns(tasks) for goal_type, tasks in TASK_TEMPLATES.items()
+})
+
+# Keywords for priority assignment
+PRIORITY_KEYWORDS = MappingProxyType({
+    "high": ("urgent", "critical", "essential", "immediate", "launch", "deadline", "core", "main", "primary"),
+    "medium": ("important", "secondary", "support", "enhancement", "feature", "improvement"),
+    "low": ("optional", "nice-to-have", "future", "documentation", "cleanup", "optimization")
+})
+
+# Duration estimates for different task types
+DURATION_ESTIMATES = MappingProxyType({
+    "research": 8,
+    "planning": 4,
+    "development": 16,
+    "testing": 8,
+    "deployment": 6,
+    "documentation": 4,
+    "marketing": 12,
+    "design": 12,
+    "setup": 4,
+    "default": 8
+})
+
+# Description templates keyed by the title fragment they match
+DESCRIPTION_TEMPLATES = MappingProxyType({
+    "Market Research": "Research the target market for {goal} to understand user needs and competition.",
+    "Define Requirements": "Define clear requirements and specifications for {goal}.",
+    "Set up Environment": "Set up the development environment and necessary tools for {goal}.",
+    "Design": "Create designs and mockups for {goal} focusing on user experience.",
+    "Implement": "Implement the core functionality for {goal}.",
+    "Testing": "Test {goal} thoroughly to ensure quality and functionality.",
+    "Deploy": "Deploy {goal} to production environment.",
+    "Documentation": "Create comprehensive documentation for {goal}.",
+    "Marketing": "Develop marketing strategy and materials for {goal}."
+})
+
 class LocalAIService:
     def __init__(self):
         """Initialize the local AI service with templates and patterns"""
-        self.task_templates = self._load_task_templates()
-        self.priority_keywords = self._load_priority_keywords()
-        self.duration_estimates = self._load_duration_estimates()
-    
-    def _load_task_templates(self) -> Dict[str, List[Dict]]:
-        """Load task templates for different types of goals"""
-        return {
-            "product_launch": [
-                {"title": "Market Research and Analysis", "duration": 16, "priority": "high"},
-                {"title": "Define Product Requirements", "duration": 12, "priority": "high"},
-                {"title": "Create Project Timeline", "duration": 4, "priority": "high"},
-                {"title": "Set up Development Environment", "duration": 8, "priority": "high"},
-                {"title": "Design User Interface", "duration": 20, "priority": "medium"},
-                {"title": "Implement Core Features", "duration": 40, "priority": "high"},
-                {"title": "Write Unit Tests", "duration": 16, "priority": "medium"},
-                {"title": "Integration Testing", "duration": 12, "priority": "medium"},
-                {"title": "User Acceptance Testing", "duration": 8, "priority": "medium"},
-                {"title": "Deploy to Production", "duration": 8, "priority": "high"},
-                {"title": "Create Documentation", "duration": 12, "priority": "low"},
-                {"title": "Marketing and Promotion", "duration": 16, "priority": "medium"}
-            ],
-            "learning": [
-                {"title": "Research Learning Resources", "duration": 4, "priority": "high"},
-                {"title": "Set Learning Goals", "duration": 2, "priority": "high"},
-                {"title": "Create Study Schedule", "duration": 2, "priority": "high"},
-                {"title": "Complete Basic Tutorials", "duration": 16, "priority": "high"},
-                {"title": "Practice with Small Projects", "duration": 24, "priority": "medium"},
-                {"title": "Join Learning Community", "duration": 4, "priority": "low"},
-                {"title": "Build Portfolio Project", "duration": 32, "priority": "medium"},
-                {"title": "Seek Feedback and Mentorship", "duration": 8, "priority": "medium"},
-                {"title": "Advanced Practice", "duration": 20, "priority": "medium"},
-                {"title": "Document Learning Journey", "duration": 4, "priority": "low"}
-            ],
-            "event_planning": [
-                {"title": "Define Event Objectives", "duration": 4, "priority": "high"},
-                {"title": "Set Budget and Timeline", "duration": 4, "priority": "high"},
-                {"title": "Choose Venue and Date", "duration": 8, "priority": "high"},
-                {"title": "Create Guest List", "duration": 4, "priority": "medium"},
-                {"title": "Send Invitations", "duration": 4, "priority": "medium"},
-                {"title": "Plan Activities and Agenda", "duration": 12, "priority": "medium"},
-                {"title": "Arrange Catering", "duration": 6, "priority": "medium"},
-                {"title": "Set up Equipment and Decorations", "duration": 8, "priority": "low"},
-                {"title": "Coordinate with Vendors", "duration": 6, "priority": "medium"},
-                {"title": "Final Preparations", "duration": 4, "priority": "high"},
-                {"title": "Execute Event", "duration": 8, "priority": "high"},
-                {"title": "Follow-up and Feedback", "duration": 4, "priority": "low"}
-            ],
-            "business_startup": [
-                {"title": "Market Research and Validation", "duration": 20, "priority": "high"},
-                {"title": "Create Business Plan", "duration": 16, "priority": "high"},
-                {"title": "Register Business Entity", "duration": 4, "priority": "high"},
-                {"title": "Set up Financial Systems", "duration": 8, "priority": "high"},
-                {"title": "Develop MVP (Minimum Viable Product)", "duration": 60, "priority": "high"},
-                {"title": "Build Brand Identity", "duration": 12, "priority": "medium"},
-                {"title": "Create Marketing Strategy", "duration": 16, "priority": "medium"},
-                {"title": "Launch Website", "duration": 20, "priority": "medium"},
-                {"title": "Find First Customers", "duration": 24, "priority": "high"},
-                {"title": "Gather Customer Feedback", "duration": 8, "priority": "medium"},
-                {"title": "Iterate and Improve", "duration": 20, "priority": "medium"},
-                {"title": "Scale Operations", "duration": 32, "priority": "low"}
-            ],
-            "mobile_app": [
-                {"title": "Define App Requirements", "duration": 8, "priority": "high"},
-                {"title": "Create Wireframes and Mockups", "duration": 16, "priority": "high"},
-                {"title": "Set up Development Environment", "duration": 6, "priority": "high"},
-                {"title": "Implement User Authentication", "duration": 12, "priority": "high"},
-                {"title": "Develop Core Features", "duration": 40, "priority": "high"},
-                {"title": "Integrate APIs and Backend", "duration": 20, "priority": "medium"},
-                {"title": "Implement UI/UX Design", "duration": 24, "priority": "medium"},
-                {"title": "Testing and Bug Fixes", "duration": 16, "priority": "medium"},
-                {"title": "Performance Optimization", "duration": 12, "priority": "medium"},
-                {"title": "Prepare for App Store", "duration": 8, "priority": "high"},
-                {"title": "Submit for Review", "duration": 2, "priority": "high"},
-                {"title": "Launch and Marketing", "duration": 16, "priority": "medium"}
-            ]
+        self.task_templates = TEMPLATE_COLUMNS
+        self.priority_keywords = PRIORITY_KEYWORDS
+        self.duration_estimates = DURATION_ESTIMATES
+        # (lowercased title key, description template), first match wins
+        self.description_templates = tuple(
+            (key.lower(), template) for key, template in DESCRIPTION_TEMPLATES.items()
+        )
+        
+        # Keyword tables for the matchers, built once instead of per call.
+        # Matching stays substring-based ("app" also matches "apps" and
+        # "application"), so the matchers below search for them as
+        # substrings rather than intersecting them with word tokens
+        self.goal_type_keywords = {
+            "mobile_app": frozenset({"app", "mobile", "ios", "android", "react native"}),
+            "learning": frozenset({"learn", "study", "course", "tutorial", "skill"}),
+            "event_planning": frozenset({"event", "party", "conference", "meeting", "gathering"}),
+            "business_startup": frozenset({"business", "startup", "company", "entrepreneur"}),
+            "product_launch": frozenset({"launch", "product", "release", "deploy"}),
         }
-    
-    def _load_priority_keywords(self) -> Dict[str, List[str]]:
-        """Load keywords for priority assignment"""
-        return {
-            "high": ["urgent", "critical", "essential", "immediate", "launch", "deadline", "core", "main", "primary"],
-            "medium": ["important", "secondary", "support", "enhancement", "feature", "improvement"],
-            "low": ["optional", "nice-to-have", "future", "documentation", "cleanup", "optimization"]
+        self.priority_keyword_sets = {
+            priority: frozenset(keywords) for priority, keywords in self.priority_keywords.items()
         }
-    
-    def _load_duration_estimates(self) -> Dict[str, int]:
-        """Load duration estimates for different task types"""
-        return {
-            "research": 8,
-            "planning": 4,
-            "development": 16,
-            "testing": 8,
-            "deployment": 6,
-            "documentation": 4,
-            "marketing": 12,
-            "design": 12,
-            "setup": 4,
-            "default": 8
+        self.complexity_keywords = {
+            complexity: keywords for keywords, complexity, _, _ in COMPLEXITY_TABLE
+        }
+        self.keyword_tables = {
+            "goal_type": self.goal_type_keywords,
+            "priority": self.priority_keyword_sets,
+            "complexity": self.complexity_keywords,
         }
+        # One bit per (table, category), so a match result is a single int
+        # and picking the winning category is a few ANDs
+        self.category_bits = {}
+        bit = 1
+        for table, categories in self.keyword_tables.items():
+            self.category_bits[table] = {}
+            for category in categories:
+                self.category_bits[table][category] = bit
+                bit <<= 1
+        self.keyword_automatons = self._build_keyword_automatons()
+        
+        # Breakdowns depend only on their inputs, so repeated prompts (UI
+        # retries, demos) are served from a per-service LRU cache
+        self._cached_breakdown = lru_cache(maxsize=512)(self._generate_task_breakdown_sync)
+        self._cached_breakdown_bytes = lru_cache(maxsize=512)(self._generate_task_breakdown_bytes_sync)
+    
+    def _build_keyword_automatons(self):
+        """Build one Aho-Corasick automaton per keyword table (pyahocorasick is optional)"""
+        if ahocorasick is None:
+            return None
+        
+        # Per table, so a lookup only sweeps that table's keywords; a
+        # keyword in several categories carries the bits of all of them
+        automatons = {}
+        for table, categories in self.keyword_tables.items():
+            masks = {}
+            for category, keywords in categories.items():
+                for keyword in keywords:
+                    masks[keyword] = masks.get(keyword, 0) | self.category_bits[table][category]
+            automaton = ahocorasick.Automaton()
+            for keyword, mask in masks.items():
+                automaton.add_word(keyword, mask)
+            automaton.make_automaton()
+            automatons[table] = automaton
+        return automatons
+    
+    def _keyword_mask(self, text: str, table: str) -> int:
+        """Bits of the categories of a keyword table matched in the lowercased text"""
+        mask = 0
+        if self.keyword_automatons is not None:
+            # One linear sweep finds every keyword occurrence at once
+            for _, keyword_mask in self.keyword_automatons[table].iter(text):
+                mask |= keyword_mask
+            return mask
+        
+        # Plain substring scans; on these short texts they beat a regex alternation
+        bits = self.category_bits[table]
+        for category, keywords in self.keyword_tables[table].items():
+            if any(keyword in text for keyword in keywords):
+                mask |= bits[category]
+        return mask
     
     async def generate_task_breakdown(self, goal: str, timeline_weeks: Optional[int] = None, 
                                     additional_context: Optional[str] = None) -> Dict[str, Any]:
         """
         Generate task breakdown using local AI logic
         """
+        # Callers edit the tasks they get back, so never hand out the cached
+        # dicts; the only mutable values are the tasks and their dependency
+        # lists, so copying those is enough (and far cheaper than deepcopy)
+        cached = self._cached_breakdown(goal, timeline_weeks, additional_context)
+        return {
+            **cached,
+            "tasks": [{**task, "dependencies": list(task["dependencies"])} for task in cached["tasks"]],
+        }
+    
+    async def generate_task_breakdown_bytes(self, goal: str, timeline_weeks: Optional[int] = None,
+                                          additional_context: Optional[str] = None) -> bytes:
+        """
+        Generate the task breakdown already serialized as JSON
+        """
+        # Bytes are immutable, so the cached payload is returned as is
+        return self._cached_breakdown_bytes(goal, timeline_weeks, additional_context)
+    
+    def _generate_task_breakdown_bytes_sync(self, goal: str, timeline_weeks: Optional[int],
+                                            additional_context: Optional[str]) -> bytes:
+        """Serialize a (cached) breakdown once per distinct input"""
+        return orjson.dumps(self._cached_breakdown(goal, timeline_weeks, additional_context))
+    
+    def _generate_task_breakdown_sync(self, goal: str, timeline_weeks: Optional[int],
+                                      additional_context: Optional[str]) -> Dict[str, Any]:
+        """Build the task breakdown; pure, so its results are cached"""
         try:
+            # Lowercase once; every keyword check below works on these
+            goal_lower = goal.lower()
+            context_lower = (additional_context or "").lower()
+            
             # Analyze the goal to determine the type
-            goal_type = self._analyze_goal_type(goal, additional_context)
+            goal_type = self._analyze_goal_type(goal_lower, context_lower)
             
             # Get base templates
             base_tasks = self.task_templates.get(goal_type, self.task_templates["product_launch"])
             
             # Customize tasks based on goal specifics
-            customized_tasks = self._customize_tasks(base_tasks, goal, additional_context, timeline_weeks)
+            customized_tasks = self._customize_tasks(base_tasks, goal_lower, context_lower, timeline_weeks)
             
             # Calculate dependencies
             tasks_with_dependencies = self._add_dependencies(customized_tasks)
@@ -150,62 +332,58 @@ class LocalAIService:
                 "tasks": self._get_fallback_tasks(goal)
             }
     
-    def _analyze_goal_type(self, goal: str, context: Optional[str] = None) -> str:
-        """Analyze goal to determine the most appropriate template"""
-        text = (goal + " " + (context or "")).lower()
+    def _analyze_goal_type(self, goal_lower: str, context_lower: str = "") -> str:
+        """Analyze the lowercased goal to determine the most appropriate template"""
+        text = goal_lower + " " + context_lower
+        
+        # Check for specific keywords, first matching type wins
+        mask = self._keyword_mask(text, "goal_type")
+        for goal_type, bit in self.category_bits["goal_type"].items():
+            if mask & bit:
+                return goal_type
         
-        # Check for specific keywords
-        if any(word in text for word in ["app", "mobile", "ios", "android", "react native"]):
-            return "mobile_app"
-        elif any(word in text for word in ["learn", "study", "course", "tutorial", "skill"]):
-            return "learning"
-        elif any(word in text for word in ["event", "party", "conference", "meeting", "gathering"]):
-            return "event_planning"
-        elif any(word in text for word in ["business", "startup", "company", "entrepreneur"]):
-            return "business_startup"
-        elif any(word in text for word in ["launch", "product", "release", "deploy"]):
-            return "product_launch"
-        else:
-            return "product_launch"  # Default fallback
+        return "product_launch"  # Default fallback
     
-    def _customize_tasks(self, base_tasks: List[Dict], goal: str, context: Optional[str], 
+    def _customize_tasks(self, base_tasks: Dict[str, tuple], goal_lower: str, context_lower: str, 
                         timeline_weeks: Optional[int]) -> List[Dict]:
         """Customize tasks based on specific goal requirements"""
-        customized = []
+        # Adjust durations based on timeline constraints
+        durations = self._scale_durations(base_tasks["durations"], timeline_weeks)
         
-        for i, task in enumerate(base_tasks):
-            # Customize title based on goal
-            title = self._customize_task_title(task["title"], goal, context)
-            
-            # Adjust duration based on timeline constraints
-            duration = task["duration"]
-            if timeline_weeks:
-                # Scale duration based on timeline
-                max_hours = timeline_weeks * 40  # 40 hours per week
-                if duration > max_hours / len(base_tasks):
-                    duration = max(4, max_hours // len(base_tasks))
-            
-            # Determine priority
-            priority = self._determine_priority(task["title"], goal, context)
-            
-            customized_task = {
-                "title": title,
-                "description": self._generate_task_description(title, goal),
-                "priority": priority,
+        customize_title = self._customize_task_title
+        describe = self._generate_task_description
+        determine_priority = self._determine_priority
+        
+        return [
+            {
+                # Customize title based on goal
+                "title": (title := customize_title(base_title, goal_lower)),
+                "description": describe(title, goal_lower),
+                "priority": determine_priority(base_title_lower, goal_lower, context_lower),
                 "estimated_duration_hours": duration,
                 "dependencies": [],
                 "due_date_offset_days": i * 2  # Spread tasks over time
             }
-            
-            customized.append(customized_task)
+            for i, (base_title, base_title_lower, duration) in enumerate(
+                zip(base_tasks["titles"], base_tasks["titles_lower"], durations)
+            )
+        ]
+    
+    @staticmethod
+    def _scale_durations(durations: tuple, timeline_weeks: Optional[int]) -> tuple:
+        """Cap task durations so the template fits the timeline"""
+        if not timeline_weeks or not durations:
+            return durations
         
-        return customized
+        # Scale duration based on timeline: tasks over their even share of
+        # the hours are cut to that share, but never below 4 hours
+        max_hours = timeline_weeks * 40  # 40 hours per week
+        share = max_hours / len(durations)
+        capped = max(4, max_hours // len(durations))
+        return tuple(duration if duration <= share else capped for duration in durations)
     
-    def _customize_task_title(self, base_title: str, goal: str, context: Optional[str]) -> str:
+    def _customize_task_title(self, base_title: str, goal_lower: str) -> str:
         """Customize task title based on goal specifics"""
-        # Extract key terms from goal
-        goal_lower = goal.lower()
-        
         # Replace generic terms with specific ones
         if "app" in goal_lower or "mobile" in goal_lower:
             base_title = base_title.replace("Product", "App")
@@ -216,122 +394,117 @@ class LocalAIService:
         
         return base_title
     
-    def _generate_task_description(self, title: str, goal: str) -> str:
+    def _generate_task_description(self, title: str, goal_lower: str) -> str:
         """Generate a description for the task"""
-        descriptions = {
-            "Market Research": f"Research the target market for {goal.lower()} to understand user needs and competition.",
-            "Define Requirements": f"Define clear requirements and specifications for {goal.lower()}.",
-            "Set up Environment": f"Set up the development environment and necessary tools for {goal.lower()}.",
-            "Design": f"Create designs and mockups for {goal.lower()} focusing on user experience.",
-            "Implement": f"Implement the core functionality for {goal.lower()}.",
-            "Testing": f"Test {goal.lower()} thoroughly to ensure quality and functionality.",
-            "Deploy": f"Deploy {goal.lower()} to production environment.",
-            "Documentation": f"Create comprehensive documentation for {goal.lower()}.",
-            "Marketing": f"Develop marketing strategy and materials for {goal.lower()}."
-        }
+        title_lower = title.lower()
         
         # Find matching description
-        for key, desc in descriptions.items():
-            if key.lower() in title.lower():
-                return desc
+        for key, template in self.description_templates:
+            if key in title_lower:
+                return template.format(goal=goal_lower)
         
-        return f"Complete the {title.lower()} phase for {goal.lower()}."
+        return f"Complete the {title_lower} phase for {goal_lower}."
     
-    def _determine_priority(self, title: str, goal: str, context: Optional[str]) -> str:
-        """Determine task priority based on keywords and context"""
-        text = (title + " " + goal + " " + (context or "")).lower()
+    def _determine_priority(self, title_lower: str, goal_lower: str, context_lower: str) -> str:
+        """Determine task priority based on keywords and context (all lowercased)"""
+        text = title_lower + " " + goal_lower + " " + context_lower
         
-        for priority, keywords in self.priority_keywords.items():
-            if any(keyword in text for keyword in keywords):
+        mask = self._keyword_mask(text, "priority")
+        for priority, bit in self.category_bits["priority"].items():
+            if mask & bit:
                 return priority
         
         return "medium"  # Default priority
     
     def _add_dependencies(self, tasks: List[Dict]) -> List[Dict]:
         """Add logical dependencies between tasks"""
-        for i, task in enumerate(tasks):
-            dependencies = []
-            
-            # Add dependencies based on task type and position
-            if i > 0:
-                # Each task depends on the previous one (simple linear dependency)
-                dependencies.append(i - 1)
+        flags = [self._title_flags(task["title"].lower()) for task in tasks]
+        
+        for task, dependencies in zip(tasks, self._build_dependencies(flags)):
+            # Remove duplicates, keeping the order the rules added them in
+            task["dependencies"] = list(dict.fromkeys(dependencies))
+        
+        return tasks
+    
+    @staticmethod
+    def _title_flags(title_lower: str) -> int:
+        """Encode the title keywords the dependency rules look at as bit flags"""
+        flags = 0
+        if "implement" in title_lower or "develop" in title_lower:
+            flags |= IMPLEMENT_TASK
+        if "test" in title_lower:
+            flags |= TEST_TASK
+        if "testing" in title_lower:
+            flags |= TESTING_TASK
+        if "deploy" in title_lower:
+            flags |= DEPLOY_TASK
+        return flags
+    
+    @staticmethod
+    def _build_dependencies(flags: List[int]) -> List[List[int]]:
+        """Dependency indices for each task, from its title flags"""
+        # Indices of the implementation and test tasks seen so far, kept in
+        # one forward pass instead of rescanning earlier tasks for each task
+        implement_indices = []
+        test_indices = []
+        dependencies = []
+        
+        for i, task_flags in enumerate(flags):
+            # Each task depends on the previous one (simple linear dependency)
+            task_dependencies = [i - 1] if i > 0 else []
             
             # Special dependency rules
-            task_title = task["title"].lower()
-            if "testing" in task_title:
+            if task_flags & TESTING_TASK:
                 # Testing depends on implementation
-                for j, prev_task in enumerate(tasks[:i]):
-                    if "implement" in prev_task["title"].lower() or "develop" in prev_task["title"].lower():
-                        dependencies.append(j)
-            elif "deploy" in task_title:
+                task_dependencies.extend(implement_indices)
+            elif task_flags & DEPLOY_TASK:
                 # Deployment depends on testing
-                for j, prev_task in enumerate(tasks[:i]):
-                    if "test" in prev_task["title"].lower():
-                        dependencies.append(j)
+                task_dependencies.extend(test_indices)
             
-            task["dependencies"] = list(set(dependencies))  # Remove duplicates
+            if task_flags & IMPLEMENT_TASK:
+                implement_indices.append(i)
+            if task_flags & TEST_TASK:
+                test_indices.append(i)
+            dependencies.append(task_dependencies)
         
-        return tasks
+        return dependencies
     
     def _generate_reasoning(self, goal: str, goal_type: str, task_count: int, 
                           timeline_weeks: Optional[int]) -> str:
         """Generate reasoning for the task breakdown"""
-        reasoning_parts = [
+        timeline_note = (
+            (f"Adjusted task durations to fit within the {timeline_weeks}-week timeline.",)
+            if timeline_weeks else ()
+        )
+        
+        return " ".join((
             f"Analyzed the goal '{goal}' and identified it as a {goal_type.replace('_', ' ')} project.",
             f"Generated {task_count} actionable tasks based on best practices for this type of project.",
-        ]
-        
-        if timeline_weeks:
-            reasoning_parts.append(f"Adjusted task durations to fit within the {timeline_weeks}-week timeline.")
-        
-        reasoning_parts.extend([
-            "Tasks are ordered logically with dependencies to ensure smooth progression.",
-            "Priority levels are assigned based on importance and dependencies.",
-            "Time estimates are realistic and account for potential challenges."
-        ])
-        
-        return " ".join(reasoning_parts)
+            *timeline_note,
+            REASONING_NOTES
+        ))
     
-    def _get_fallback_tasks(self, goal: str) -> List[Dict]:
+    @staticmethod
+    def _get_fallback_tasks(goal: str) -> List[Dict]:
         """Get fallback tasks if main logic fails"""
         return [
             {
-                "title": f"Plan and Research {goal}",
-                "description": f"Research and plan the approach for {goal}",
-                "priority": "high",
-                "estimated_duration_hours": 8,
-                "dependencies": [],
-                "due_date_offset_days": 0
-            },
-            {
-                "title": f"Implement Core Features for {goal}",
-                "description": f"Implement the main functionality for {goal}",
-                "priority": "high",
-                "estimated_duration_hours": 16,
-                "dependencies": [0],
-                "due_date_offset_days": 2
-            },
-            {
-                "title": f"Test and Validate {goal}",
-                "description": f"Test the implementation of {goal}",
-                "priority": "medium",
-                "estimated_duration_hours": 8,
-                "dependencies": [1],
-                "due_date_offset_days": 4
-            },
-            {
-                "title": f"Deploy and Launch {goal}",
-                "description": f"Deploy and launch {goal}",
-                "priority": "high",
-                "estimated_duration_hours": 4,
-                "dependencies": [2],
-                "due_date_offset_days": 6
+                "title": title.format(goal=goal),
+                "description": description.format(goal=goal),
+                "priority": priority,
+                "estimated_duration_hours": hours,
+                "dependencies": list(dependencies),
+                "due_date_offset_days": offset_days
             }
+            for title, description, priority, hours, dependencies, offset_days in FALLBACK_TASKS
         ]
     
     async def generate_task_suggestions(self, current_task: str, context: str = "") -> List[str]:
         """Generate suggestions for improving a task"""
+        return self._generate_task_suggestions_sync(current_task, context)
+    
+    def _generate_task_suggestions_sync(self, current_task: str, context: str = "") -> List[str]:
+        """Build the task suggestions; plain CPU work, no awaits"""
         suggestions = [
             "Break down into smaller, more specific subtasks",
             "Add measurable success criteria",
@@ -362,37 +535,26 @@ class LocalAIService:
     
     async def analyze_task_complexity(self, task: str) -> Dict[str, Any]:
         """Analyze task complexity"""
+        return self._analyze_task_complexity_sync(task)
+    
+    def _analyze_task_complexity_sync(self, task: str) -> Dict[str, Any]:
+        """Build the complexity analysis; plain CPU work, no awaits"""
         task_lower = task.lower()
         
         # Determine complexity based on keywords
-        if any(word in task_lower for word in ["research", "plan", "setup", "configure"]):
-            complexity = "low"
-            hours = 4
-            skills = ["Research", "Planning", "Basic technical skills"]
-        elif any(word in task_lower for word in ["implement", "develop", "build", "create"]):
-            complexity = "high"
-            hours = 16
-            skills = ["Programming", "System design", "Problem solving"]
-        elif any(word in task_lower for word in ["test", "validate", "review"]):
-            complexity = "medium"
-            hours = 8
-            skills = ["Testing", "Quality assurance", "Attention to detail"]
-        else:
-            complexity = "medium"
-            hours = 8
-            skills = ["General project management", "Communication"]
-        
-        challenges = [
-            "Time estimation accuracy",
-            "Resource availability",
-            "Technical complexity",
-            "External dependencies"
-        ]
+        mask = self._keyword_mask(task_lower, "complexity")
+        bits = self.category_bits["complexity"]
+        complexity, hours, skills = DEFAULT_COMPLEXITY
+        for _, profile_complexity, profile_hours, profile_skills in COMPLEXITY_TABLE:
+            if mask & bits[profile_complexity]:
+                complexity, hours, skills = profile_complexity, profile_hours, profile_skills
+                break
         
         return {
             "complexity": complexity,
             "estimated_hours": hours,
-            "required_skills": skills,
-            "potential_challenges": challenges,
+            # Fresh lists so callers cannot edit the shared profiles
+            "required_skills": list(skills),
+            "potential_challenges": list(TASK_CHALLENGES),
             "suggested_approach": f"Break down the {complexity} complexity task into smaller steps and allocate appropriate time for each phase."
         }
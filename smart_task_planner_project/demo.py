@@ -7,9 +7,9 @@ Demonstrates the key features of the Smart Task Planner
 import asyncio
 import json
 from app.services.local_ai_service import LocalAIService
-from app.database import init_db, get_db
+from app.database import init_db, AsyncSessionLocal, database
 from app.models import Goal, Plan, Task
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, insert
 
 async def demo_llm_service():
     """Demonstrate LLM service functionality"""
@@ -69,16 +69,21 @@ async def demo_task_analysis():
         "Deploy to app stores"
     ]
     
-    for task in test_tasks:
+    # The analyses are independent, so request them all at once
+    analyses = await asyncio.gather(
+        *(llm_service.analyze_task_complexity(task) for task in test_tasks),
+        return_exceptions=True
+    )
+    
+    for task, analysis in zip(test_tasks, analyses):
         print(f"\nAnalyzing: {task}")
-        try:
-            analysis = await llm_service.analyze_task_complexity(task)
-            print(f"  Complexity: {analysis.get('complexity', 'unknown')}")
-            print(f"  Estimated hours: {analysis.get('estimated_hours', 'TBD')}")
-            print(f"  Required skills: {', '.join(analysis.get('required_skills', []))}")
-            print(f"  Challenges: {', '.join(analysis.get('potential_challenges', []))}")
-        except Exception as e:
-            print(f"  ❌ Analysis error: {e}")
+        if isinstance(analysis, Exception):
+            print(f"  ❌ Analysis error: {analysis}")
+            continue
+        print(f"  Complexity: {analysis.get('complexity', 'unknown')}")
+        print(f"  Estimated hours: {analysis.get('estimated_hours', 'TBD')}")
+        print(f"  Required skills: {', '.join(analysis.get('required_skills', []))}")
+        print(f"  Challenges: {', '.join(analysis.get('potential_challenges', []))}")
 
 async def demo_task_suggestions():
     """Demonstrate task suggestions functionality"""
@@ -115,66 +120,58 @@ async def demo_database_operations():
         print("✅ Database initialized")
         
         # Get database session
-        db_gen = get_db()
-        db = next(db_gen)
-        
-        # Create a goal
-        goal = Goal(
-            title="Demo Goal",
-            description="A demonstration goal",
-            user_input="Launch a demo application"
-        )
-        db.add(goal)
-        db.commit()
-        db.refresh(goal)
-        print(f"✅ Goal created with ID: {goal.id}")
-        
-        # Create a plan
-        plan = Plan(
-            goal_id=goal.id,
-            title="Demo Plan",
-            description="A demonstration plan",
-            estimated_duration_days=7
-        )
-        db.add(plan)
-        db.commit()
-        db.refresh(plan)
-        print(f"✅ Plan created with ID: {plan.id}")
-        
-        # Create tasks
-        tasks_data = [
-            {"title": "Setup project", "priority": "high", "estimated_duration_hours": 4},
-            {"title": "Implement features", "priority": "medium", "estimated_duration_hours": 16},
-            {"title": "Test application", "priority": "medium", "estimated_duration_hours": 8},
-            {"title": "Deploy application", "priority": "high", "estimated_duration_hours": 4}
-        ]
-        
-        for task_data in tasks_data:
-            task = Task(
-                plan_id=plan.id,
-                title=task_data["title"],
-                priority=task_data["priority"],
-                estimated_duration_hours=task_data["estimated_duration_hours"]
+        async with AsyncSessionLocal() as db:
+            # Create a goal
+            goal = Goal(
+                title="Demo Goal",
+                description="A demonstration goal",
+                user_input="Launch a demo application"
             )
-            db.add(task)
-        
-        db.commit()
-        print(f"✅ {len(tasks_data)} tasks created")
-        
-        # Query data
-        goals_count = db.query(Goal).count()
-        plans_count = db.query(Plan).count()
-        tasks_count = db.query(Task).count()
-        
-        print(f"\n📊 Database Statistics:")
-        print(f"  Goals: {goals_count}")
-        print(f"  Plans: {plans_count}")
-        print(f"  Tasks: {tasks_count}")
-        
-        db.close()
+            db.add(goal)
+            await db.commit()
+            print(f"✅ Goal created with ID: {goal.id}")
+            
+            # Create a plan
+            plan = Plan(
+                goal_id=goal.id,
+                title="Demo Plan",
+                description="A demonstration plan",
+                estimated_duration_days=7
+            )
+            db.add(plan)
+            await db.commit()
+            print(f"✅ Plan created with ID: {plan.id}")
+            
+            # Create tasks
+            tasks_data = [
+                {"title": "Setup project", "priority": "high", "estimated_duration_hours": 4},
+                {"title": "Implement features", "priority": "medium", "estimated_duration_hours": 16},
+                {"title": "Test application", "priority": "medium", "estimated_duration_hours": 8},
+                {"title": "Deploy application", "priority": "high", "estimated_duration_hours": 4}
+            ]
+            
+            # One executemany INSERT instead of a unit-of-work object per task
+            await db.execute(
+                insert(Task), [{"plan_id": plan.id, **task_data} for task_data in tasks_data]
+            )
+            await db.commit()
+            print(f"✅ {len(tasks_data)} tasks created")
+            
+            # Query data
+            goals_count = await db.scalar(select(func.count(Goal.id)))
+            plans_count = await db.scalar(select(func.count(Plan.id)))
+            tasks_count = await db.scalar(select(func.count(Task.id)))
+            
+            print(f"\n📊 Database Statistics:")
+            print(f"  Goals: {goals_count}")
+            print(f"  Plans: {plans_count}")
+            print(f"  Tasks: {tasks_count}")
         
     except Exception as e:
         print(f"❌ Database error: {e}")
+    finally:
+        # Pooled connections keep aiosqlite worker threads alive until disposed
+        await database.disconnect()
 
 async def main():
     """Run all demos"""
@@ -19,10 +19,16 @@ if __name__ == "__main__":
     print("📚 API Docs: http://localhost:8000/docs")
     print()
     
+    # Auto-reload only when DEV=1: the file watcher costs a process and
+    # cannot be combined with several workers.
+    # loop/http "auto" pick uvloop and httptools (uvicorn[standard]) when installed
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=os.getenv("DEV") == "1",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="auto",
+        http="auto",
         log_level="info"
     )
@@ -3,27 +3,163 @@
 Smart Task Planner Setup Script
 """
 
-import os
 import sys
+
+# Refuse old interpreters before importing anything else
+if sys.hexversion < 0x03080000:
+    print("❌ Python 3.8 or higher is required")
+    sys.exit(1)
+
+import os
 import subprocess
-import shutil
+import hashlib
+import glob
+
+try:
+    from packaging.requirements import Requirement
+except ImportError:  # Optional: without it every run goes through pip
+    Requirement = None
+
+# pip keeps downloaded and built wheels here across setup runs
+PIP_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "smart_task_planner", "pip")
+# Hash of the requirements last installed successfully
+DEPS_MARKER = ".deps_hash"
+# Exact pins of the last full install, replayed without the resolver
+LOCK_FILE = "requirements.lock"
+# Source and requirements state of the last run whose app imports succeeded
+IMPORTS_MARKER = ".last_import_ok"
+# .env compiled to Python constants, so later runs load bytecode instead of parsing
+ENV_CACHE = "_env_cache.py"
 
 def check_python_version():
-    if sys.version_info < (3, 8):
-        print("❌ Python 3.8 or higher is required")
-        return False
+    # Older versions already exited at import
     print(f"✅ Python version: {sys.version.split()[0]}")
     return True
 
-def install_dependencies():
-    print("\n📦 Installing dependencies...")
+def requirements_hash():
+    """Hash requirements.txt together with the interpreter it is installed into"""
+    with open("requirements.txt", "rb") as f:
+        return hashlib.sha256(sys.executable.encode() + b"\0" + f.read()).hexdigest()
+
+def lock_header():
+    """First line of requirements.lock, tying it to the requirements.txt it came from"""
+    with open("requirements.txt", "rb") as f:
+        return f"# Pinned by setup.py from requirements.txt {hashlib.sha256(f.read()).hexdigest()}\n"
+
+def lock_is_current():
+    if not os.path.exists(LOCK_FILE):
+        return False
+    with open(LOCK_FILE) as f:
+        return f.readline() == lock_header()
+
+def read_requirements():
+    """requirements.txt parsed into Requirement objects, skipping other platforms' lines"""
+    with open("requirements.txt") as f:
+        requirements = [Requirement(line) for line in (line.split("#")[0].strip() for line in f) if line]
+    return [requirement for requirement in requirements if not requirement.marker or requirement.marker.evaluate()]
+
+def write_lock_file():
+    """Pin requirements.txt and everything it pulls in to the versions now installed"""
+    from importlib.metadata import version, requires, PackageNotFoundError
+    import re
+    
+    pins = {}
+    pending = [(requirement, "") for requirement in read_requirements()]
+    while pending:
+        requirement, extra = pending.pop()
+        if requirement.marker and not requirement.marker.evaluate({"extra": extra}):
+            continue
+        name = re.sub(r"[-_.]+", "-", requirement.name).lower()
+        extras = set(requirement.extras)
+        if name in pins and extras <= pins[name][1]:
+            continue
+        
+        try:
+            installed = version(requirement.name)
+        except PackageNotFoundError:
+            return  # Not everything landed; leave pip to resolve next time
+        pins.setdefault(name, (installed, set()))[1].update(extras)
+        for line in requires(requirement.name) or []:
+            dependency = Requirement(line)
+            for dependency_extra in [""] + sorted(extras):
+                pending.append((dependency, dependency_extra))
+    
+    with open(LOCK_FILE, "w") as f:
+        f.write(lock_header())
+        f.writelines(f"{name}=={pinned}\n" for name, (pinned, _) in sorted(pins.items()))
+
+def requirement_satisfied(requirement):
+    """Check an installed distribution against a requirement, extras included"""
+    from importlib.metadata import version, requires, PackageNotFoundError
+    
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
-        print("✅ Dependencies installed successfully")
+        installed = version(requirement.name)
+    except PackageNotFoundError:
+        return False
+    if not requirement.specifier.contains(installed, prereleases=True):
+        return False
+    
+    # uvicorn[standard] also needs whatever its "standard" extra pulls in
+    for extra in requirement.extras:
+        for line in requires(requirement.name) or []:
+            dependency = Requirement(line)
+            if dependency.marker and dependency.marker.evaluate({"extra": extra}):
+                if not requirement_satisfied(dependency):
+                    return False
+    return True
+
+def requirements_satisfied():
+    """True when every line of requirements.txt is already installed"""
+    if Requirement is None:
+        return False
+    return all(requirement_satisfied(requirement) for requirement in read_requirements())
+
+def start_install_dependencies():
+    """Start pip in the background; returns its process, or None if nothing to install"""
+    print("\n📦 Installing dependencies...")
+    deps_hash = requirements_hash()
+    if os.path.exists(DEPS_MARKER):
+        with open(DEPS_MARKER) as f:
+            if f.read().strip() == deps_hash:
+                print("✅ Dependencies up to date (requirements.txt unchanged)")
+                return None
+    
+    if requirements_satisfied():
+        with open(DEPS_MARKER, "w") as f:
+            f.write(deps_hash)
+        print("✅ Dependencies already satisfied")
+        return None
+    
+    # A current lock already lists every package, so pip can skip resolving
+    if lock_is_current():
+        print("📌 Installing pinned versions from requirements.lock")
+        target = ["--no-deps", "-r", LOCK_FILE]
+    else:
+        target = ["-r", "requirements.txt"]
+    
+    # pip's output streams straight through while the other steps run
+    return subprocess.Popen([
+        sys.executable, "-m", "pip", "install",
+        "--no-input", "--disable-pip-version-check",
+        "--cache-dir", PIP_CACHE_DIR, "--prefer-binary",
+        *target
+    ])
+
+def finish_install_dependencies(proc):
+    """Wait for a pip run started by start_install_dependencies"""
+    if proc is None:
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Failed to install dependencies: {e}")
+    
+    returncode = proc.wait()
+    if returncode != 0:
+        print(f"❌ Failed to install dependencies: pip exited with status {returncode}")
         return False
+    with open(DEPS_MARKER, "w") as f:
+        f.write(requirements_hash())
+    if Requirement is not None and not lock_is_current():
+        write_lock_file()
+    print("✅ Dependencies installed successfully")
+    return True
 
 def setup_environment():
     """Set up environment file"""
@@ -37,6 +173,7 @@ def setup_environment():
         return True
     
     if os.path.exists(env_example):
+        import shutil
         shutil.copy(env_example, env_file)
         print("✅ Created .env file from template")
         print("⚠️  Please edit .env file and add your OpenAI API key")
@@ -55,39 +192,104 @@ def create_directories():
         "app/routers"
     ]
     
+    # Let makedirs report existing directories instead of stat-ing first
     for directory in directories:
-        if not os.path.exists(directory):
+        try:
             os.makedirs(directory)
             print(f"✅ Created directory: {directory}")
-        else:
+        except FileExistsError:
             print(f"✅ Directory exists: {directory}")
 
+def parse_env_file(path):
+    """KEY=value lines of a .env file; enough for env_example.txt without importing dotenv"""
+    values = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("export "):
+                line = line[len("export "):]
+            key, sep, value = line.partition("=")
+            if not sep:
+                continue
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1]
+            else:
+                value = value.split(" #")[0].rstrip()
+            values[key.strip()] = value
+    return values
+
+def load_env_cache():
+    """Load .env from its compiled cache, rebuilding the cache when .env changes"""
+    import importlib.util
+    import keyword
+    
+    def load():
+        spec = importlib.util.spec_from_file_location("_env_cache", ENV_CACHE)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    
+    env_mtime = os.path.getmtime(".env")
+    if os.path.exists(ENV_CACHE):
+        try:
+            cache = load()
+        except Exception:
+            cache = None  # Unreadable cache (e.g. an older setup.py wrote it); rebuild
+        if getattr(cache, "ENV_MTIME", None) == env_mtime:
+            return cache
+    
+    lines = [f"ENV_MTIME = {env_mtime!r}\n"]
+    lines += [
+        f"{key} = {value!r}\n"
+        for key, value in parse_env_file(".env").items()
+        # Only names that can be assigned, and never the cache's own ENV_MTIME
+        if key.isidentifier() and not keyword.iskeyword(key) and key != "ENV_MTIME"
+    ]
+    with open(ENV_CACHE, "w") as f:
+        f.writelines(lines)
+    # The bytecode check only sees whole-second mtimes, so drop the old .pyc
+    stale_pyc = importlib.util.cache_from_source(os.path.abspath(ENV_CACHE))
+    if os.path.exists(stale_pyc):
+        os.remove(stale_pyc)
+    return load()
+
 def check_openai_key():
     """Check if OpenAI API key is configured (optional)"""
     print("\n🔑 Checking OpenAI API key (optional)...")
     
-    # Load environment variables
-    try:
-        from dotenv import load_dotenv
-        load_dotenv()
-        
-        api_key = os.getenv("OPENAI_API_KEY")
-        if api_key and api_key != "your_openai_api_key_here":
-            print("✅ OpenAI API key is configured - enhanced AI features available")
-            return True
-        else:
-            print("ℹ️  No OpenAI API key configured - using local AI service")
-            print("   The system works perfectly without an API key!")
-            print("   Optional: Add OpenAI API key for enhanced AI features")
-            return True  # This is not an error anymore
-    except ImportError:
-        print("ℹ️  python-dotenv not installed, using local AI service")
+    # Load environment variables; exported ones win, as with load_dotenv
+    env = load_env_cache() if os.path.exists(".env") else None
+    
+    api_key = os.getenv("OPENAI_API_KEY", getattr(env, "OPENAI_API_KEY", None))
+    if api_key and api_key != "your_openai_api_key_here":
+        print("✅ OpenAI API key is configured - enhanced AI features available")
         return True
+    else:
+        print("ℹ️  No OpenAI API key configured - using local AI service")
+        print("   The system works perfectly without an API key!")
+        print("   Optional: Add OpenAI API key for enhanced AI features")
+        return True  # This is not an error anymore
+
+def imports_key():
+    """Identify the app sources and requirements the import check ran against"""
+    sources = glob.glob("app/**/*.py", recursive=True)
+    newest = max((os.path.getmtime(path) for path in sources), default=0)
+    return f"{requirements_hash()}:{len(sources)}:{newest!r}"
 
 def run_tests():
     """Run basic tests"""
     print("\n🧪 Running basic tests...")
     
+    key = imports_key()
+    if os.path.exists(IMPORTS_MARKER):
+        with open(IMPORTS_MARKER) as f:
+            if f.read().strip() == key:
+                print("✅ Imports cached (app sources unchanged)")
+                return True
+    
     try:
         # Test imports
         from app.main import app
@@ -98,6 +300,8 @@ def run_tests():
         # Test database models
         print("✅ Database models loaded")
         
+        with open(IMPORTS_MARKER, "w") as f:
+            f.write(key)
         return True
     except Exception as e:
         print(f"❌ Test failed: {e}")
@@ -114,15 +318,16 @@ def main():
     if not check_python_version():
         success = False
     
-    # Create directories
-    create_directories()
+    # Install dependencies in the background
+    pip_proc = start_install_dependencies()
     
-    # Install dependencies
-    if not install_dependencies():
+    # Create directories and setup environment; neither needs the dependencies
+    create_directories()
+    if not setup_environment():
         success = False
     
-    # Setup environment
-    if not setup_environment():
+    # Everything from here on imports the dependencies
+    if not finish_install_dependencies(pip_proc):
         success = False
     
     # Check OpenAI key